@@ -1,23 +1,55 @@
 """
 Configuration file for environment variables and app settings
+Environment is read once at import into an immutable Settings snapshot
 """
+import logging
 import os
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
-load_dotenv()
+load_dotenv(override=False)
 
-# MongoDB Configuration
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-MONGODB_NAME = os.getenv("MONGODB_NAME", "GeoStaff")
+logger = logging.getLogger(__name__)
 
-# JWT Configuration
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
-JWT_ALGORITHM = "HS256"
-JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-# App Configuration
-APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
-APP_PORT = int(os.getenv("APP_PORT", 8000))
+class ConfigurationError(RuntimeError):
+    """Raised at import when the environment holds an unusable setting"""
+
+
+# Supported JWT algorithms. HMAC ones map to the recommended minimum secret
+# length in bytes (the hash output size, per RFC 7518 section 3.2); asymmetric ones
+# need JWT_PRIVATE_KEY and JWT_PUBLIC_KEY
+JWT_HMAC_ALGORITHMS = {"HS256": 32, "HS384": 48, "HS512": 64}
+JWT_ASYMMETRIC_ALGORITHMS = frozenset({"EdDSA", "ES256", "RS256"})
+
+
+@dataclass(frozen=True, slots=True)
+class _Settings:
+    """Immutable snapshot of the app configuration"""
+    # MongoDB Configuration
+    MONGODB_URI: str
+    MONGODB_NAME: str
+    MONGO_MIN_POOL: int
+    MONGO_MAX_POOL: int
+    MONGO_TIMEOUT_MS: int
+    MONGO_COMPRESSORS: str
+
+    # JWT Configuration
+    JWT_SECRET_KEY: str
+    JWT_ALGORITHM: str
+    JWT_PRIVATE_KEY: str
+    JWT_PUBLIC_KEY: str
+    JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int
+    JWT_USER_RECHECK_MINUTES: int
+
+    # App Configuration
+    APP_HOST: str
+    APP_PORT: int
+
+    # CORS Configuration
+    CORS_ORIGINS: frozenset[str]
+    CORS_ORIGIN_REGEX: str
+
 
 # CORS Configuration
 # Comma-separated list of origins. Example:
@@ -25,5 +57,76 @@ APP_PORT = int(os.getenv("APP_PORT", 8000))
 # Optional regex support via CORS_ORIGIN_REGEX. Example:
 #   CORS_ORIGIN_REGEX=^https://(.*\\.)?example\\.com$
 _cors_origins_raw = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000")
-CORS_ORIGINS = [o.strip() for o in _cors_origins_raw.split(",") if o.strip()]
-CORS_ORIGIN_REGEX = os.getenv("CORS_ORIGIN_REGEX", "")
+
+settings = _Settings(
+    MONGODB_URI=os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+    MONGODB_NAME=os.getenv("MONGODB_NAME", "GeoStaff"),
+    MONGO_MIN_POOL=int(os.getenv("MONGO_MIN_POOL", 10)),
+    MONGO_MAX_POOL=int(os.getenv("MONGO_MAX_POOL", 50)),
+    MONGO_TIMEOUT_MS=int(os.getenv("MONGO_TIMEOUT_MS", 5000)),
+    # Wire compression in order of preference; the server picks the first it
+    # also supports (zlib needs no extra package, so it is the fallback)
+    MONGO_COMPRESSORS=os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
+    JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production"),
+    # HS256 signs with JWT_SECRET_KEY. Asymmetric algorithms (e.g. EdDSA with
+    # an Ed25519 keypair) sign and verify with the PEM keys below instead
+    JWT_ALGORITHM=os.getenv("JWT_ALGORITHM", "HS256"),
+    JWT_PRIVATE_KEY=os.getenv("JWT_PRIVATE_KEY", ""),
+    JWT_PUBLIC_KEY=os.getenv("JWT_PUBLIC_KEY", ""),
+    JWT_ACCESS_TOKEN_EXPIRE_MINUTES=60 * 24,  # 24 hours
+    # How long /auth/refresh may re-sign from token claims before re-reading the user
+    JWT_USER_RECHECK_MINUTES=int(os.getenv("JWT_USER_RECHECK_MINUTES", 60)),
+    APP_HOST=os.getenv("APP_HOST", "0.0.0.0"),
+    APP_PORT=int(os.getenv("APP_PORT", 8000)),
+    CORS_ORIGINS=frozenset(o.strip() for o in _cors_origins_raw.split(",") if o.strip()),
+    CORS_ORIGIN_REGEX=os.getenv("CORS_ORIGIN_REGEX", ""),
+)
+
+
+def _validate_jwt_settings(s: _Settings):
+    """
+    Fail fast on a JWT algorithm/key combination that can't work
+    A short HMAC secret still works, so it only logs a warning
+    """
+    algorithm = s.JWT_ALGORITHM
+    if algorithm in JWT_HMAC_ALGORITHMS:
+        min_length = JWT_HMAC_ALGORITHMS[algorithm]
+        if len(s.JWT_SECRET_KEY.encode("utf-8")) < min_length:
+            logger.warning(
+                "JWT_SECRET_KEY is shorter than the %s bytes recommended for %s",
+                min_length, algorithm
+            )
+    elif algorithm in JWT_ASYMMETRIC_ALGORITHMS:
+        if not s.JWT_PRIVATE_KEY or not s.JWT_PUBLIC_KEY:
+            raise ConfigurationError(
+                f"JWT_ALGORITHM={algorithm} requires JWT_PRIVATE_KEY and JWT_PUBLIC_KEY (PEM)"
+            )
+    else:
+        supported = ", ".join([*JWT_HMAC_ALGORITHMS, *sorted(JWT_ASYMMETRIC_ALGORITHMS)])
+        raise ConfigurationError(
+            f"Unsupported JWT_ALGORITHM {algorithm!r}; expected one of: {supported}"
+        )
+
+
+_validate_jwt_settings(settings)
+
+# Module-level names kept for existing imports
+MONGODB_URI = settings.MONGODB_URI
+MONGODB_NAME = settings.MONGODB_NAME
+MONGO_MIN_POOL = settings.MONGO_MIN_POOL
+MONGO_MAX_POOL = settings.MONGO_MAX_POOL
+MONGO_TIMEOUT_MS = settings.MONGO_TIMEOUT_MS
+MONGO_COMPRESSORS = settings.MONGO_COMPRESSORS
+
+JWT_SECRET_KEY = settings.JWT_SECRET_KEY
+JWT_ALGORITHM = settings.JWT_ALGORITHM
+JWT_PRIVATE_KEY = settings.JWT_PRIVATE_KEY
+JWT_PUBLIC_KEY = settings.JWT_PUBLIC_KEY
+JWT_ACCESS_TOKEN_EXPIRE_MINUTES = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+JWT_USER_RECHECK_MINUTES = settings.JWT_USER_RECHECK_MINUTES
+
+APP_HOST = settings.APP_HOST
+APP_PORT = settings.APP_PORT
+
+CORS_ORIGINS = settings.CORS_ORIGINS
+CORS_ORIGIN_REGEX = settings.CORS_ORIGIN_REGEX
@@ -1,12 +1,24 @@
 """
 MongoDB database connection and instance
 """
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGODB_URI, MONGODB_NAME
+from pymongo import WriteConcern
+from config import (
+    MONGODB_URI,
+    MONGODB_NAME,
+    MONGO_MIN_POOL,
+    MONGO_MAX_POOL,
+    MONGO_TIMEOUT_MS,
+    MONGO_COMPRESSORS
+)
 
 # Global MongoDB client and database instances
 mongo_client: AsyncIOMotorClient = None
 database = None
+# Attendance handle acknowledged by the primary only (no journal wait);
+# clients retry on failure, so this trades durability for write latency
+attendance_collection = None
 
 
 async def connect_to_mongo():
@@ -14,18 +26,94 @@ async def connect_to_mongo():
     Establish connection to MongoDB
     Called on application startup
     """
-    global mongo_client, database
+    global mongo_client, database, attendance_collection
     try:
-        mongo_client = AsyncIOMotorClient(MONGODB_URI)
+        mongo_client = AsyncIOMotorClient(
+            MONGODB_URI,
+            minPoolSize=MONGO_MIN_POOL,
+            maxPoolSize=MONGO_MAX_POOL,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_TIMEOUT_MS,
+            compressors=MONGO_COMPRESSORS
+        )
         database = mongo_client[MONGODB_NAME]
-        # Test the connection
-        await mongo_client.admin.command('ping')
+        attendance_collection = database.get_collection(
+            "attendance", write_concern=WriteConcern(w=1, j=False)
+        )
+        # Test the connection and warm up the pool with concurrent pings
+        # so early requests don't pay connection setup
+        await asyncio.gather(*(
+            mongo_client.admin.command('ping')
+            for _ in range(max(1, MONGO_MIN_POOL))
+        ))
         print(f"✓ Connected to MongoDB: {MONGODB_NAME}")
+        await create_indexes()
     except Exception as e:
         print(f"✗ Failed to connect to MongoDB: {e}")
         raise e
 
 
+async def create_indexes():
+    """
+    Create indexes backing the hot attendance, auth and leave queries
+    Called once after connecting; no-op if the indexes already exist
+    """
+    await asyncio.gather(
+        # Lookups by user and type over a time range (today's check-in/check-out,
+        # monthly summary), with the newest-first sort supplied by the index
+        database.attendance.create_index(
+            [("user_id", 1), ("type", 1), ("timestamp", -1)],
+            background=True,
+            name="user_type_ts"
+        ),
+        # Queries by user without a type filter (history, recent, export)
+        database.attendance.create_index(
+            [("user_id", 1), ("timestamp", -1)],
+            background=True,
+            name="user_ts"
+        ),
+        # Small partial index over check-ins only (check-in guard, monthly summary);
+        # ascending timestamp keeps its key pattern distinct from user_ts
+        database.attendance.create_index(
+            [("user_id", 1), ("timestamp", 1)],
+            partialFilterExpression={"type": "check-in"},
+            background=True,
+            name="open_checkin"
+        ),
+        # User lookups by phone number
+        database.users.create_index("phone", unique=True, background=True),
+        # One OTP per phone; MongoDB removes each once its expires_at has passed
+        database.otps.create_index("phone", unique=True, background=True),
+        database.otps.create_index("expires_at", expireAfterSeconds=0, background=True),
+        # Leave history filtered by status (and pending counts), newest first
+        database.leave_requests.create_index(
+            [("user_id", 1), ("status", 1), ("applied_at", -1)],
+            background=True,
+            name="user_status_applied"
+        ),
+        # Unfiltered leave history, newest first
+        database.leave_requests.create_index(
+            [("user_id", 1), ("applied_at", -1)],
+            background=True,
+            name="user_applied"
+        ),
+        # Overlapping leave checks on apply
+        database.leave_requests.create_index(
+            [("user_id", 1), ("start_date", 1), ("end_date", 1)],
+            background=True,
+            name="user_dates"
+        ),
+        # One balance per user and year
+        database.leave_balances.create_index(
+            [("user_id", 1), ("year", 1)],
+            unique=True,
+            background=True,
+            name="user_year"
+        )
+    )
+    print("✓ MongoDB indexes ensured")
+
+
 async def close_mongo_connection():
     """
     Close MongoDB connection
@@ -43,3 +131,11 @@ def get_database():
     Use this function to access the database in routes
     """
     return database
+
+
+def get_attendance_collection():
+    """
+    Get the attendance collection with the relaxed write concern
+    Use this for attendance inserts on the check-in/check-out path
+    """
+    return attendance_collection
@@ -1,21 +1,26 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 from contextlib import asynccontextmanager
-import uvicorn
 
 from config import CORS_ORIGINS, CORS_ORIGIN_REGEX, APP_HOST, APP_PORT
 from database import connect_to_mongo, close_mongo_connection
 from routes import health, auth, attendance, leave
+from routes.attendance import XLSX_MEDIA_TYPE
+from utils.logging_config import start_logging, stop_logging
 
 
 # Lifespan event handler for startup and shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Connect to MongoDB
+    # Startup: Hand log records to a background thread, then connect to MongoDB
+    start_logging()
     await connect_to_mongo()
     yield
-    # Shutdown: Close MongoDB connection
+    # Shutdown: Close MongoDB connection and flush pending log records
     await close_mongo_connection()
+    stop_logging()
 
 
 # Initialize FastAPI app
@@ -34,16 +39,25 @@ cors_kwargs = {
 }
 
 # Always include explicit origins if provided (and not just '*')
-explicit_origins = [o for o in CORS_ORIGINS if o != "*"]
+# Passed as a frozenset so the per-request origin check is O(1)
+explicit_origins = CORS_ORIGINS - {"*"}
 if explicit_origins:
     cors_kwargs["allow_origins"] = explicit_origins
 
 # If regex provided, or wildcard '*' present, enable regex mode
+# (Starlette compiles the pattern once when the middleware is built)
 if CORS_ORIGIN_REGEX:
     cors_kwargs["allow_origin_regex"] = CORS_ORIGIN_REGEX
 elif "*" in CORS_ORIGINS:
     cors_kwargs["allow_origin_regex"] = ".*"
 
+# Compress JSON and CSV responses; XLSX is already a zip archive
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1024,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + (XLSX_MEDIA_TYPE,)
+)
+
 app.add_middleware(CORSMiddleware, **cors_kwargs)
 
 # Include routers
@@ -64,5 +78,7 @@ async def root():
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     print("Starting GeoStaff API...")
     uvicorn.run("main:app", host=APP_HOST, port=APP_PORT, reload=True)
@@ -0,0 +1,37 @@
+"""
+One-off migration: convert leave start/end dates stored as ISO strings
+to BSON dates
+
+Leave requests used to be stored with "YYYY-MM-DD" string dates; the app now
+stores midnight datetimes and compares them as dates, so string-dated
+requests would be missed by the overlap check. Run once after deploying:
+
+    python migrate_leave_dates.py
+
+Safe to re-run; requests that already have BSON dates are left untouched.
+"""
+from pymongo import MongoClient
+from config import MONGODB_URI, MONGODB_NAME
+
+
+def main():
+    client = MongoClient(MONGODB_URI)
+    try:
+        leave_requests = client[MONGODB_NAME].leave_requests
+        result = leave_requests.update_many(
+            {"$or": [
+                {"start_date": {"$type": "string"}},
+                {"end_date": {"$type": "string"}}
+            ]},
+            [{"$set": {
+                "start_date": {"$toDate": "$start_date"},
+                "end_date": {"$toDate": "$end_date"}
+            }}]
+        )
+        print(f"✅ Converted dates on {result.modified_count} leave requests")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
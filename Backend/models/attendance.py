@@ -2,25 +2,33 @@
 Attendance Model
 Schema for attendance records with geolocation tracking
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from typing import Optional, Literal, Dict, Any
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+# IST Timezone offset (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def to_ist_iso(v: datetime) -> str:
+    """Render a stored (naive UTC) timestamp as an IST ISO string, to the millisecond"""
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    return v.astimezone(IST).isoformat(timespec="milliseconds")
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-    
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
+
+class AttendanceType(str, Enum):
+    """Attendance event type"""
+    CHECK_IN = "check-in"
+    CHECK_OUT = "check-out"
+
+
+class WorkStatus(str, Enum):
+    """Work location type"""
+    OFFICE = "office"
+    SITE = "site"
+    REMOTE = "remote"
 
 
 class Location(BaseModel):
@@ -31,44 +39,11 @@ class Location(BaseModel):
     address: Optional[str] = None  # Reverse geocoded address
 
 
-class AttendanceRecord(BaseModel):
-    """Complete attendance record"""
-    id: Optional[PyObjectId] = Field(default=None, alias="_id")
-    user_id: str = Field(..., description="User's phone number")
-    type: Literal["check-in", "check-out"] = Field(..., description="Check-in or check-out")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-    location: Location = Field(..., description="Geolocation at time of attendance")
-    device_id: str = Field(..., description="Device identifier for verification")
-    work_status: Literal["office", "site", "remote"] = Field(..., description="Work location type")
-    photo_url: Optional[str] = None  # URL to stored photo (if captured)
-    notes: Optional[str] = None
-    
-    class Config:
-        populate_by_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        json_schema_extra = {
-            "example": {
-                "user_id": "+911234567890",
-                "type": "check-in",
-                "location": {
-                    "latitude": 28.7041,
-                    "longitude": 77.1025,
-                    "accuracy": 10.5,
-                    "address": "Connaught Place, New Delhi"
-                },
-                "device_id": "device_123abc",
-                "work_status": "office",
-                "photo_url": "https://storage.example.com/photos/123.jpg"
-            }
-        }
-
-
 class AttendanceCheckIn(BaseModel):
     """Request payload for check-in"""
     location: Location
     device_id: str
-    work_status: Literal["office", "site", "remote"]
+    work_status: WorkStatus
     photo_url: Optional[str] = None
     notes: Optional[str] = None
 
@@ -80,11 +55,22 @@ class AttendanceCheckOut(BaseModel):
     notes: Optional[str] = None
 
 
+class AttendanceAck(BaseModel):
+    """Acknowledgement of a stored attendance record"""
+    id: str
+    timestamp: datetime
+    
+    @field_serializer("timestamp", when_used="json")
+    def serialize_timestamp(self, v: datetime) -> str:
+        """Timestamps are stored as naive UTC; present them in IST"""
+        return to_ist_iso(v)
+
+
 class AttendanceResponse(BaseModel):
-    """Response with attendance record and status"""
+    """Response with attendance acknowledgement and status"""
     success: bool
     message: str
-    attendance: Optional[Dict[str, Any]] = None
+    attendance: Optional[AttendanceAck] = None
     hours_worked: Optional[float] = None  # For check-out responses
 
 
@@ -102,3 +88,20 @@ class AttendanceHistoryResponse(BaseModel):
     total_count: int
     page: int
     page_size: int
+
+
+class RecentAttendanceResponse(BaseModel):
+    """Daily attendance summaries for the last N days"""
+    days: int
+    records: list[Dict[str, Any]]
+
+
+class MonthlySummaryResponse(BaseModel):
+    """Monthly attendance counts"""
+    year: int
+    month: int
+    present_days: int
+    absent_days: int
+    leave_days: int
+    working_days: int
+    total_days: int
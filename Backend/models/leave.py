@@ -2,10 +2,38 @@
 Leave Management Models
 Handles leave requests, balances, and types
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, PlainValidator
+from typing import Optional, List, Annotated
+from bson import ObjectId
 from datetime import datetime, date
 from enum import Enum
+from functools import lru_cache
+import time
+
+
+@lru_cache(maxsize=1)
+def _year_for_minute(minute_bucket: int) -> int:
+    """UTC year for a minute bucket (cached; the year rarely changes)"""
+    return time.gmtime(minute_bucket * 60).tm_year
+
+
+def _current_year() -> int:
+    """Current UTC year, recomputed at most once per minute"""
+    return _year_for_minute(int(time.time()) // 60)
+
+
+def _parse_object_id(value: str) -> ObjectId:
+    """Parse a hex id once at request validation (invalid ids become a 422)"""
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise ValueError("Invalid id")
+    return ObjectId(value)
+
+
+# Path/query id given as a hex string and parsed into an ObjectId by FastAPI
+ObjectIdParam = Annotated[
+    ObjectId,
+    PlainValidator(_parse_object_id, json_schema_input_type=str)
+]
 
 
 class LeaveType(str, Enum):
@@ -37,12 +65,6 @@ class LeaveRequest(BaseModel):
     approved_at: Optional[datetime] = None
     rejection_reason: Optional[str] = None
     cancelled_at: Optional[datetime] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat()
-        }
 
 
 class LeaveRequestCreate(BaseModel):
@@ -51,11 +73,6 @@ class LeaveRequestCreate(BaseModel):
     start_date: date
     end_date: date
     reason: str
-    
-    class Config:
-        json_encoders = {
-            date: lambda v: v.isoformat()
-        }
 
 
 class LeaveBalance(BaseModel):
@@ -68,12 +85,7 @@ class LeaveBalance(BaseModel):
     used_casual: float = 0.0
     used_sick: float = 0.0
     used_earned: float = 0.0
-    year: int = Field(default_factory=lambda: datetime.utcnow().year)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    year: int = Field(default_factory=_current_year)
 
 
 class LeaveRequestResponse(BaseModel):
@@ -91,12 +103,6 @@ class LeaveRequestResponse(BaseModel):
     approved_at: Optional[datetime] = None
     rejection_reason: Optional[str] = None
     cancelled_at: Optional[datetime] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat()
-        }
 
 
 class LeaveHistoryResponse(BaseModel):
@@ -6,6 +6,13 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional
 from datetime import datetime
 from enum import Enum
+import re
+
+
+# Compiled once at import for the phone/OTP validators; ASCII digits only,
+# since \d would also accept other scripts' digits (e.g. Arabic-Indic)
+_NONDIGIT = re.compile(r"[^0-9]")
+_OTP_PATTERN = re.compile(r"[0-9]{6}")
 
 
 class UserRole(str, Enum):
@@ -30,7 +37,7 @@ class User(BaseModel):
     def validate_phone(cls, v):
         """Validate phone number format"""
         # Remove any spaces or special characters
-        cleaned = ''.join(filter(str.isdigit, v))
+        cleaned = _NONDIGIT.sub("", v)
         if len(cleaned) < 10:
             raise ValueError('Phone number must be at least 10 digits')
         return cleaned
@@ -59,7 +66,7 @@ class UserCreate(BaseModel):
     @validator('phone')
     def validate_phone(cls, v):
         """Validate phone number format"""
-        cleaned = ''.join(filter(str.isdigit, v))
+        cleaned = _NONDIGIT.sub("", v)
         if len(cleaned) < 10:
             raise ValueError('Phone number must be at least 10 digits')
         return cleaned
@@ -94,7 +101,7 @@ class LoginRequest(BaseModel):
     @validator('phone')
     def validate_phone(cls, v):
         """Validate phone number format"""
-        cleaned = ''.join(filter(str.isdigit, v))
+        cleaned = _NONDIGIT.sub("", v)
         if len(cleaned) < 10:
             raise ValueError('Phone number must be at least 10 digits')
         return cleaned
@@ -109,7 +116,7 @@ class OTPVerifyRequest(BaseModel):
     @validator('otp')
     def validate_otp(cls, v):
         """Validate OTP format"""
-        if not v.isdigit() or len(v) != 6:
+        if not _OTP_PATTERN.fullmatch(v):
             raise ValueError('OTP must be a 6-digit number')
         return v
 
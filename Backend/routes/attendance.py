@@ -4,75 +4,143 @@ Endpoints for check-in/check-out and attendance tracking
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
+import asyncio
+import csv
 import logging
 import io
-import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 
 from models.attendance import (
+    AttendanceAck,
     AttendanceCheckIn,
     AttendanceCheckOut,
-    AttendanceRecord,
     AttendanceResponse,
+    AttendanceType,
     TodayAttendanceResponse,
-    AttendanceHistoryResponse
+    AttendanceHistoryResponse,
+    RecentAttendanceResponse,
+    MonthlySummaryResponse,
+    IST
 )
 from routes.auth import get_current_user
-from database import get_database
+from utils.jwt_handler import UserInfo
+from database import get_database, get_attendance_collection
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 logger = logging.getLogger(__name__)
 
-# IST Timezone offset (UTC+5:30)
-IST = timezone(timedelta(hours=5, minutes=30))
+# IST offset in the form MongoDB date operators accept
+IST_OFFSET = "+05:30"
+
+def ist_date_string(field, fmt):
+    """Build a $dateToString expression rendering a stored UTC date in IST"""
+    return {"$dateToString": {"date": field, "timezone": IST_OFFSET, "format": fmt}}
+
+# Server-side equivalent of convert_datetime_to_ist_iso; every endpoint renders
+# timestamps with milliseconds, the precision MongoDB stores dates at
+IST_ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%L" + IST_OFFSET
+
+# Record fields returned to clients; omits _id, the caller's own user_id and photo_url
+RECORD_PROJECTION = {
+    "_id": 0,
+    "type": 1,
+    "timestamp": 1,
+    "location": 1,
+    "device_id": 1,
+    "work_status": 1,
+    "notes": 1
+}
 
 def get_ist_now():
     """Get current time in IST"""
     return datetime.now(IST)
 
+# Cache of (today_start_utc, today_end_utc) keyed by IST date
+_DAY_CACHE: dict[date, tuple[datetime, datetime]] = {}
+
 def get_today_range_ist():
-    """Get start and end of today in IST, returns both aware datetimes and ISO strings"""
-    now_ist = get_ist_now()
-    today_start = now_ist.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-    # Return UTC datetimes for database queries
-    return today_start.astimezone(timezone.utc), today_end.astimezone(timezone.utc)
+    """Get start and end of today in IST as UTC datetimes, cached per IST date"""
+    today_ist_date = get_ist_now().date()
+    day_range = _DAY_CACHE.get(today_ist_date)
+    if day_range is None:
+        today_start = datetime.combine(today_ist_date, datetime.min.time(), tzinfo=IST)
+        today_end = today_start + timedelta(days=1)
+        # Store UTC datetimes for database queries
+        day_range = (today_start.astimezone(timezone.utc), today_end.astimezone(timezone.utc))
+        # Keep at most the current and previous day around midnight
+        while len(_DAY_CACHE) >= 2:
+            _DAY_CACHE.pop(next(iter(_DAY_CACHE)))
+        _DAY_CACHE[today_ist_date] = day_range
+    return day_range
+
+def count_weekdays(first: date, num_days: int) -> int:
+    """Count Monday-Friday days in the num_days days starting at first"""
+    full_weeks, remainder = divmod(num_days, 7)
+    start_weekday = first.weekday()  # Monday=0, Sunday=6
+    return full_weeks * 5 + sum(
+        1 for i in range(remainder) if (start_weekday + i) % 7 < 5
+    )
+
+async def find_today_records(db, user_id, projection=None):
+    """
+    Fetch today's check-in and check-out for a user in a single query
+    Returns (check_in, check_out); the earliest of each type wins
+    """
+    today_start, today_end = get_today_range_ist()
+    docs = await db.attendance.find(
+        {
+            "user_id": user_id,
+            "type": {"$in": ["check-in", "check-out"]},
+            "timestamp": {"$gte": today_start, "$lt": today_end}
+        },
+        projection=projection
+    ).sort("timestamp", 1).to_list(length=None)
+    check_in = next((d for d in docs if d["type"] == "check-in"), None)
+    check_out = next((d for d in docs if d["type"] == "check-out"), None)
+    return check_in, check_out
 
 def convert_datetime_to_ist_iso(dt):
     """Convert a datetime object (UTC or naive) to IST ISO string"""
     if dt is None:
         return None
+    tz = dt.tzinfo
+    # Already in IST - no conversion needed
+    if tz is IST:
+        return dt.isoformat(timespec="milliseconds")
     # If datetime is naive (from MongoDB), assume it's UTC
-    if dt.tzinfo is None:
+    if tz is None:
         dt = dt.replace(tzinfo=timezone.utc)
-    # Convert to IST
-    ist_dt = dt.astimezone(IST)
-    # Return ISO string with timezone offset
-    return ist_dt.isoformat()
+    # Return ISO string with IST offset
+    return dt.astimezone(IST).isoformat(timespec="milliseconds")
 
 
 @router.post("/check-in", response_model=AttendanceResponse)
 async def check_in(
     check_in_data: AttendanceCheckIn,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Check-in endpoint with geolocation and device verification
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Get today's date range in IST
         today_start, today_end = get_today_range_ist()
         
         # Check if already checked in today
-        existing_checkin = await db.attendance.find_one({
-            "user_id": user_id,
-            "type": "check-in",
-            "timestamp": {"$gte": today_start.isoformat(), "$lt": today_end.isoformat()}
-        })
+        existing_checkin = await db.attendance.find_one(
+            {
+                "user_id": user_id,
+                "type": "check-in",
+                "timestamp": {"$gte": today_start, "$lt": today_end}
+            },
+            projection={"_id": 1}
+        )
         
         if existing_checkin:
             raise HTTPException(
@@ -81,54 +149,51 @@ async def check_in(
             )
         
         # Verify device consistency (optional - can be made stricter)
-        user = await db.users.find_one({"phone": user_id})
-        if user and user.get("device_id") and user["device_id"] != check_in_data.device_id:
-            logger.warning(f"Device mismatch for user {user_id}: expected {user['device_id']}, got {check_in_data.device_id}")
+        # The user's registered device travels in the token, so no users lookup
+        user_device_id = current_user.device_id
+        if user_device_id and user_device_id != check_in_data.device_id:
+            logger.warning("Device mismatch for user %s: expected %s, got %s", user_id, user_device_id, check_in_data.device_id)
             # For MVP, we'll allow but log the mismatch
         
-        # Update user's device_id if not set
-        if not user.get("device_id"):
-            await db.users.update_one(
-                {"phone": user_id},
-                {"$set": {"device_id": check_in_data.device_id}}
+        # Build the attendance document directly from the validated payload,
+        # with a naive UTC timestamp stored as a BSON date for proper querying
+        now_utc = datetime.utcnow()
+        attendance_doc = {
+            "user_id": user_id,
+            "type": AttendanceType.CHECK_IN.value,
+            "timestamp": now_utc,
+            "location": check_in_data.location.model_dump(),
+            "device_id": check_in_data.device_id,
+            "work_status": check_in_data.work_status.value,
+            "photo_url": check_in_data.photo_url,
+            "notes": check_in_data.notes
+        }
+        insert = get_attendance_collection().insert_one(attendance_doc)
+        if user_device_id:
+            result = await insert
+        else:
+            # Backfill user's device_id if not set, concurrently with the insert
+            result, _ = await asyncio.gather(
+                insert,
+                db.users.update_one(
+                    {"phone": user_id, "device_id": {"$in": [None, ""]}},
+                    {"$set": {"device_id": check_in_data.device_id}}
+                )
             )
+
+        logger.info("User %s checked in at %s", user_id, now_utc)
         
-        # Create attendance record with UTC timestamp for storage
-        ist_now = get_ist_now()
-        attendance_record = AttendanceRecord(
-            user_id=user_id,
-            type="check-in",
-            timestamp=ist_now,  # Pydantic will handle timezone serialization
-            location=check_in_data.location,
-            device_id=check_in_data.device_id,
-            work_status=check_in_data.work_status,
-            photo_url=check_in_data.photo_url,
-            notes=check_in_data.notes
-        )
-        
-        # Insert into database - store datetime object for proper querying
-        result = await db.attendance.insert_one(attendance_record.model_dump(by_alias=True, exclude=["id"]))
-        attendance_record.id = result.inserted_id
-        
-        logger.info(f"User {user_id} checked in at {attendance_record.timestamp}")
-        
-        # Prepare response with IST timestamp and proper serialization
-        response_data = attendance_record.model_dump(by_alias=True, exclude=["id", "_id"])
-        response_data["timestamp"] = convert_datetime_to_ist_iso(attendance_record.timestamp)
-        # Ensure location is a dict
-        if hasattr(response_data.get("location"), "model_dump"):
-            response_data["location"] = response_data["location"].model_dump()
-        
-        return AttendanceResponse(
+        # Values are built here, so skip re-validating them
+        return AttendanceResponse.model_construct(
             success=True,
             message="Checked in successfully",
-            attendance=response_data
+            attendance=AttendanceAck.model_construct(id=str(result.inserted_id), timestamp=now_utc)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Check-in failed: {str(e)}")
+        logger.error("Check-in failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process check-in"
@@ -138,24 +203,20 @@ async def check_in(
 @router.post("/check-out", response_model=AttendanceResponse)
 async def check_out(
     check_out_data: AttendanceCheckOut,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Check-out endpoint with hours calculation
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
-        # Get today's date range in IST
-        today_start, today_end = get_today_range_ist()
-        
-        # Check if already checked out today
-        existing_checkout = await db.attendance.find_one({
-            "user_id": user_id,
-            "type": "check-out",
-            "timestamp": {"$gte": today_start, "$lt": today_end}
-        })
+        # Find today's check-in and any existing check-out in one query
+        check_in_record, existing_checkout = await find_today_records(
+            db, user_id,
+            projection={"_id": 1, "type": 1, "timestamp": 1, "device_id": 1, "work_status": 1}
+        )
         
         if existing_checkout:
             raise HTTPException(
@@ -163,13 +224,6 @@ async def check_out(
                 detail="Already checked out today"
             )
         
-        # Find today's check-in
-        check_in_record = await db.attendance.find_one({
-            "user_id": user_id,
-            "type": "check-in",
-            "timestamp": {"$gte": today_start, "$lt": today_end}
-        })
-        
         if not check_in_record:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -183,49 +237,39 @@ async def check_out(
                 detail="Device mismatch. Please use the same device for check-out."
             )
         
-        # Create check-out record
-        ist_now = get_ist_now()
-        attendance_record = AttendanceRecord(
-            user_id=user_id,
-            type="check-out",
-            timestamp=ist_now,
-            location=check_out_data.location,
-            device_id=check_out_data.device_id,
-            work_status=check_in_record["work_status"],  # Use same work status as check-in
-            notes=check_out_data.notes
-        )
-        
-        # Calculate hours worked
-        check_in_time = check_in_record["timestamp"]
-        # Make timezone-aware if needed
-        if check_in_time.tzinfo is None:
-            check_in_time = check_in_time.replace(tzinfo=timezone.utc)
-        hours_worked = (ist_now - check_in_time.astimezone(IST)).total_seconds() / 3600
-        
-        # Insert into database
-        result = await db.attendance.insert_one(attendance_record.model_dump(by_alias=True, exclude=["id"]))
-        attendance_record.id = result.inserted_id
+        # Build the check-out document directly from the validated payload
+        now_utc = datetime.utcnow()
+        attendance_doc = {
+            "user_id": user_id,
+            "type": AttendanceType.CHECK_OUT.value,
+            "timestamp": now_utc,
+            "location": check_out_data.location.model_dump(),
+            "device_id": check_out_data.device_id,
+            "work_status": check_in_record["work_status"],  # Use same work status as check-in
+            "photo_url": None,
+            "notes": check_out_data.notes
+        }
         
-        logger.info(f"User {user_id} checked out at {attendance_record.timestamp}. Hours worked: {hours_worked:.2f}")
+        # Calculate hours worked (both timestamps are naive UTC)
+        hours_worked = (now_utc - check_in_record["timestamp"]).total_seconds() / 3600
         
-        # Prepare response with IST timestamp and proper serialization
-        response_data = attendance_record.model_dump(by_alias=True, exclude=["id", "_id"])
-        response_data["timestamp"] = convert_datetime_to_ist_iso(attendance_record.timestamp)
-        # Ensure location is a dict
-        if hasattr(response_data.get("location"), "model_dump"):
-            response_data["location"] = response_data["location"].model_dump()
+        # Insert into database - stored as a BSON date for proper querying
+        result = await get_attendance_collection().insert_one(attendance_doc)
+
+        logger.info("User %s checked out at %s. Hours worked: %.2f", user_id, now_utc, hours_worked)
         
-        return AttendanceResponse(
+        # Values are built here, so skip re-validating them
+        return AttendanceResponse.model_construct(
             success=True,
             message=f"Checked out successfully. Hours worked: {hours_worked:.2f}",
-            attendance=response_data,
+            attendance=AttendanceAck.model_construct(id=str(result.inserted_id), timestamp=now_utc),
             hours_worked=round(hours_worked, 2)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Check-out failed: {str(e)}")
+        logger.error("Check-out failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process check-out"
@@ -233,29 +277,16 @@ async def check_out(
 
 
 @router.get("/today", response_model=TodayAttendanceResponse)
-async def get_today_attendance(current_user: dict = Depends(get_current_user)):
+async def get_today_attendance(current_user: UserInfo = Depends(get_current_user)):
     """
     Get today's attendance status
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
-        
-        # Get today's date range in IST
-        today_start, today_end = get_today_range_ist()
-        
-        # Find today's check-in and check-out
-        check_in = await db.attendance.find_one({
-            "user_id": user_id,
-            "type": "check-in",
-            "timestamp": {"$gte": today_start, "$lt": today_end}
-        })
+        user_id = current_user.phone
         
-        check_out = await db.attendance.find_one({
-            "user_id": user_id,
-            "type": "check-out",
-            "timestamp": {"$gte": today_start, "$lt": today_end}
-        })
+        # Find today's check-in and check-out in one query
+        check_in, check_out = await find_today_records(db, user_id, projection=RECORD_PROJECTION)
         
         # Determine status and convert timestamps
         if check_out:
@@ -279,28 +310,20 @@ async def get_today_attendance(current_user: dict = Depends(get_current_user)):
             status_str = "not-started"
             hours_worked = None
         
-        # Convert to response with IST timestamps
-        check_in_record = None
-        if check_in:
-            check_in_copy = {k: v for k, v in check_in.items() if k != "_id"}
-            check_in_copy["timestamp"] = convert_datetime_to_ist_iso(check_in_copy["timestamp"])
-            check_in_record = check_in_copy
-        
-        check_out_record = None
-        if check_out:
-            check_out_copy = {k: v for k, v in check_out.items() if k != "_id"}
-            check_out_copy["timestamp"] = convert_datetime_to_ist_iso(check_out_copy["timestamp"])
-            check_out_record = check_out_copy
+        # Convert to response with IST timestamps, reusing the fetched docs in place
+        for record in (check_in, check_out):
+            if record:
+                record["timestamp"] = convert_datetime_to_ist_iso(record["timestamp"])
         
         return TodayAttendanceResponse(
-            check_in=check_in_record,
-            check_out=check_out_record,
+            check_in=check_in,
+            check_out=check_out,
             status=status_str,
             hours_worked=round(hours_worked, 2) if hours_worked else None
         )
         
     except Exception as e:
-        logger.error(f"Failed to get today's attendance: {str(e)}", exc_info=True)
+        logger.error("Failed to get today's attendance: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve attendance data: {str(e)}"
@@ -313,14 +336,14 @@ async def get_attendance_history(
     page_size: int = 50,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Get attendance history with pagination and optional date filtering
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Build query filter
         query_filter = {"user_id": user_id}
@@ -339,48 +362,51 @@ async def get_attendance_history(
         # Calculate skip for pagination
         skip = (page - 1) * page_size
         
-        # Get total count
-        total_count = await db.attendance.count_documents(query_filter)
-        
-        # Get records with pagination (newest first)
-        cursor = db.attendance.find(query_filter).sort("timestamp", -1).skip(skip).limit(page_size)
-        records = await cursor.to_list(length=page_size)
-        
-        # Convert to response models with IST timestamps
-        attendance_records = []
-        for record in records:
-            record_copy = {k: v for k, v in record.items() if k != "_id"}
-            # Convert timestamp to IST ISO string
-            record_copy["timestamp"] = convert_datetime_to_ist_iso(record_copy["timestamp"])
-            attendance_records.append(record_copy)
+        # Get paginated records (newest first) and total count in one round trip
+        pipeline = [
+            {"$match": query_filter},
+            {"$facet": {
+                "records": [
+                    {"$sort": {"timestamp": -1}},
+                    {"$skip": skip},
+                    {"$limit": page_size},
+                    {"$project": RECORD_PROJECTION},
+                    # Render timestamps in IST on the server
+                    {"$addFields": {"timestamp": ist_date_string("$timestamp", IST_ISO_FORMAT)}}
+                ],
+                "total": [{"$count": "n"}]
+            }}
+        ]
+        result = (await db.attendance.aggregate(pipeline).to_list(length=1))[0]
+        total_count = result["total"][0]["n"] if result["total"] else 0
         
         return {
-            "records": attendance_records,
+            "records": result["records"],
             "total_count": total_count,
             "page": page,
             "page_size": page_size
         }
         
     except Exception as e:
-        logger.error(f"Failed to get attendance history: {str(e)}")
+        logger.error("Failed to get attendance history: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve attendance history"
         )
 
 
-@router.get("/monthly-summary")
+@router.get("/monthly-summary", response_model=MonthlySummaryResponse)
 async def get_monthly_summary(
     year: int,
     month: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Get monthly attendance summary (present/absent days)
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Calculate month range in IST
         month_start_ist = datetime(year, month, 1, tzinfo=IST)
@@ -404,18 +430,18 @@ async def get_monthly_summary(
         month_start_utc = month_start_ist.astimezone(timezone.utc)
         month_end_utc = month_end_ist.astimezone(timezone.utc)
         
-        # Get all check-ins for the period
-        check_ins = await db.attendance.find({
-            "user_id": user_id,
-            "type": "check-in",
-            "timestamp": {"$gte": month_start_utc, "$lt": month_end_utc}
-        }).to_list(length=None)
-        
-        # Count unique days with check-ins
-        present_days = len(set(
-            record["timestamp"].astimezone(IST).date()
-            for record in check_ins
-        ))
+        # Count unique IST days with check-ins on the server
+        pipeline = [
+            {"$match": {
+                "user_id": user_id,
+                "type": "check-in",
+                "timestamp": {"$gte": month_start_utc, "$lt": month_end_utc}
+            }},
+            {"$group": {"_id": ist_date_string("$timestamp", "%Y-%m-%d")}},
+            {"$count": "present_days"}
+        ]
+        result = await db.attendance.aggregate(pipeline).to_list(length=1)
+        present_days = result[0]["present_days"] if result else 0
         
         # Calculate working days from month start to today (or month end if past month)
         from calendar import monthrange
@@ -428,10 +454,7 @@ async def get_monthly_summary(
             last_day = monthrange(year, month)[1]
         
         # Count weekdays from month start to last_day
-        working_days = sum(
-            1 for day in range(1, last_day + 1)
-            if datetime(year, month, day).weekday() < 5  # Monday=0, Friday=4
-        )
+        working_days = count_weekdays(date(year, month, 1), last_day)
         
         absent_days = max(0, working_days - present_days)
         leave_days = 0  # TODO: Integrate with leave management
@@ -447,24 +470,35 @@ async def get_monthly_summary(
         }
         
     except Exception as e:
-        logger.error(f"Failed to get monthly summary: {str(e)}")
+        logger.error("Failed to get monthly summary: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve monthly summary"
         )
 
 
-@router.get("/recent")
+def first_record_of_type(records, record_type):
+    """Aggregation expression for the first record of a type in a pushed array, or null"""
+    return {"$ifNull": [
+        {"$arrayElemAt": [
+            {"$filter": {"input": records, "cond": {"$eq": ["$$this.type", record_type]}}},
+            0
+        ]},
+        None
+    ]}
+
+
+@router.get("/recent", response_model=RecentAttendanceResponse)
 async def get_recent_attendance(
     days: int = 7,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Get recent attendance records (last N days)
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Calculate date range
         end_time = get_ist_now()
@@ -474,80 +508,92 @@ async def get_recent_attendance(
         start_time_utc = start_time.astimezone(timezone.utc)
         end_time_utc = end_time.astimezone(timezone.utc)
         
-        # Get records
-        records = await db.attendance.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": start_time_utc, "$lte": end_time_utc}
-        }).sort("timestamp", -1).to_list(length=None)
-        
-        # Group by date and calculate daily summary
-        daily_summary = {}
-        for record in records:
-            # Convert timestamp to IST for date grouping
-            record_timestamp = record["timestamp"]
-            if record_timestamp.tzinfo is None:
-                record_timestamp = record_timestamp.replace(tzinfo=timezone.utc)
-            ist_timestamp = record_timestamp.astimezone(IST)
-            date_key = ist_timestamp.date().isoformat()
-            
-            if date_key not in daily_summary:
-                daily_summary[date_key] = {
-                    "date": date_key,
-                    "check_in": None,
-                    "check_out": None,
-                    "hours_worked": None,
-                    "status": "absent"
-                }
-            
-            # Convert record timestamp to IST ISO string and create response
-            record_copy = {k: v for k, v in record.items() if k != "_id"}
-            record_copy["timestamp"] = convert_datetime_to_ist_iso(record_copy["timestamp"])
-            
-            if record["type"] == "check-in":
-                daily_summary[date_key]["check_in"] = record_copy
-                daily_summary[date_key]["status"] = "present"
-            elif record["type"] == "check-out":
-                daily_summary[date_key]["check_out"] = record_copy
-        
-        # Calculate hours for each day
-        for date_key in daily_summary:
-            day_data = daily_summary[date_key]
-            if day_data["check_in"] and day_data["check_out"]:
-                # Parse the ISO strings back to datetime for calculation
-                checkin_str = day_data["check_in"]["timestamp"]
-                checkout_str = day_data["check_out"]["timestamp"]
-                checkin_time = datetime.fromisoformat(checkin_str)
-                checkout_time = datetime.fromisoformat(checkout_str)
-                hours = (checkout_time - checkin_time).total_seconds() / 3600
-                day_data["hours_worked"] = round(hours, 2)
+        # Group by IST date and build each day's summary on the server
+        pipeline = [
+            {"$match": {
+                "user_id": user_id,
+                "timestamp": {"$gte": start_time_utc, "$lte": end_time_utc}
+            }},
+            {"$sort": {"timestamp": 1}},
+            {"$project": RECORD_PROJECTION},
+            # Keep the BSON date for grouping and hours, render the timestamp in IST
+            {"$addFields": {
+                "event_time": "$timestamp",
+                "timestamp": ist_date_string("$timestamp", IST_ISO_FORMAT)
+            }},
+            {"$group": {
+                "_id": ist_date_string("$event_time", "%Y-%m-%d"),
+                "records": {"$push": "$$ROOT"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "date": "$_id",
+                "check_in": first_record_of_type("$records", "check-in"),
+                "check_out": first_record_of_type("$records", "check-out")
+            }},
+            {"$addFields": {
+                # Null unless both records exist
+                "hours_worked": {"$round": [
+                    {"$divide": [
+                        {"$subtract": ["$check_out.event_time", "$check_in.event_time"]},
+                        3600000
+                    ]},
+                    2
+                ]},
+                "status": {"$cond": [{"$ifNull": ["$check_in", False]}, "present", "absent"]}
+            }},
+            {"$project": {"check_in.event_time": 0, "check_out.event_time": 0}},
+            {"$sort": {"date": -1}}
+        ]
+        records = await db.attendance.aggregate(pipeline).to_list(length=None)
         
         return {
             "days": days,
-            "records": list(daily_summary.values())
+            "records": records
         }
         
     except Exception as e:
-        logger.error(f"Failed to get recent attendance: {str(e)}")
+        logger.error("Failed to get recent attendance: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve recent attendance"
         )
 
 
+# Column headers for attendance exports
+EXPORT_COLUMNS = ["Date", "Time", "Type", "Status", "Location", "Accuracy", "Notes"]
+# Rows used to estimate Excel column widths before streaming the rest
+EXPORT_WIDTH_SAMPLE_ROWS = 200
+EXPORT_MAX_COLUMN_WIDTH = 50
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def format_export_row(record):
+    """Format one attendance document (with IST date_str/time_str) as an export row"""
+    return [
+        record["date_str"],
+        record["time_str"],
+        record["type"].title(),
+        (record.get("work_status") or "").title(),
+        f"{record['location']['latitude']}, {record['location']['longitude']}",
+        f"{record['location']['accuracy']}m",
+        record.get("notes", "")
+    ]
+
+
 @router.get("/export")
 async def export_attendance(
     format: str = "excel",  # "excel" or "csv"
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """
     Export attendance data to Excel or CSV
     """
     try:
         db = get_database()
-        user_id = current_user["phone"]
-        user = await db.users.find_one({"phone": user_id})
+        user_id = current_user.phone
+        user = await db.users.find_one({"phone": user_id}, projection={"name": 1})
         
         # Build query filter
         query_filter = {"user_id": user_id}
@@ -563,66 +609,88 @@ async def export_attendance(
                 date_filter["$lt"] = end_dt
             query_filter["timestamp"] = date_filter
         
-        # Get all records
-        records = await db.attendance.find(query_filter).sort("timestamp", -1).to_list(length=None)
-        
-        # Prepare data for export
-        export_data = []
-        for record in records:
-            timestamp_ist = record["timestamp"].astimezone(IST)
-            export_data.append({
-                "Date": timestamp_ist.strftime("%Y-%m-%d"),
-                "Time": timestamp_ist.strftime("%H:%M:%S"),
-                "Type": record["type"].title(),
-                "Status": record.get("work_status", "").title(),
-                "Location": f"{record['location']['latitude']}, {record['location']['longitude']}",
-                "Accuracy": f"{record['location']['accuracy']}m",
-                "Notes": record.get("notes", "")
-            })
-        
-        # Create DataFrame
-        df = pd.DataFrame(export_data)
+        # Stream records from the cursor instead of loading them all at once;
+        # IST date and time strings are formatted on the server
+        pipeline = [
+            {"$match": query_filter},
+            {"$sort": {"timestamp": -1}},
+            # Fetch only the exported fields
+            {"$project": {
+                "_id": 0,
+                "date_str": ist_date_string("$timestamp", "%Y-%m-%d"),
+                "time_str": ist_date_string("$timestamp", "%H:%M:%S"),
+                "type": 1,
+                "work_status": 1,
+                "location": 1,
+                "notes": 1
+            }}
+        ]
+        cursor = db.attendance.aggregate(pipeline, batchSize=500)
+        # Stamp the filename with today's IST date, formatted once for either branch
+        filename = f"attendance_{user.get('name', user_id)}_{get_ist_now().strftime('%Y%m%d')}"
         
         if format.lower() == "csv":
-            # Export as CSV
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            output.seek(0)
+            # Export as CSV, one row per chunk
+            async def csv_rows():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator="\n")
+                writer.writerow(EXPORT_COLUMNS)
+                yield buffer.getvalue()
+                async for record in cursor:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerow(format_export_row(record))
+                    yield buffer.getvalue()
             
             return StreamingResponse(
-                iter([output.getvalue()]),
+                csv_rows(),
                 media_type="text/csv",
                 headers={
-                    "Content-Disposition": f"attachment; filename=attendance_{user.get('name', user_id)}_{datetime.now().strftime('%Y%m%d')}.csv"
+                    "Content-Disposition": f"attachment; filename={filename}.csv"
                 }
             )
         else:
-            # Export as Excel (default)
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Attendance')
-                
-                # Auto-adjust column widths
-                worksheet = writer.sheets['Attendance']
-                for idx, col in enumerate(df.columns):
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
+            # Export as Excel (default); estimate column widths from the
+            # first rows only, tracking them inline while formatting
+            sample_rows = []
+            col_widths = [len(col) for col in EXPORT_COLUMNS]
+            async for record in cursor:
+                row = format_export_row(record)
+                for idx, value in enumerate(row):
+                    if value is not None:
+                        col_widths[idx] = max(
+                            col_widths[idx], min(len(str(value)), EXPORT_MAX_COLUMN_WIDTH)
+                        )
+                sample_rows.append(row)
+                if len(sample_rows) >= EXPORT_WIDTH_SAMPLE_ROWS:
+                    break
             
-            output.seek(0)
+            # Write-only workbook serializes rows as they are appended
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet("Attendance")
+            # Auto-adjust column widths (must be set before the first row)
+            for idx, width in enumerate(col_widths, start=1):
+                worksheet.column_dimensions[get_column_letter(idx)].width = width + 2
+            worksheet.append(EXPORT_COLUMNS)
+            for row in sample_rows:
+                worksheet.append(row)
+            # Stream the remaining rows straight from the cursor
+            async for record in cursor:
+                worksheet.append(format_export_row(record))
+            
+            output = io.BytesIO()
+            workbook.save(output)
             
             return StreamingResponse(
                 iter([output.getvalue()]),
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                media_type=XLSX_MEDIA_TYPE,
                 headers={
-                    "Content-Disposition": f"attachment; filename=attendance_{user.get('name', user_id)}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+                    "Content-Disposition": f"attachment; filename={filename}.xlsx"
                 }
             )
         
     except Exception as e:
-        logger.error(f"Failed to export attendance: {str(e)}")
+        logger.error("Failed to export attendance: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to export attendance data"
@@ -3,15 +3,49 @@ Authentication Routes
 Handles user authentication: OTP generation, verification, and token refresh
 """
 from fastapi import APIRouter, HTTPException, status, Depends
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database import get_database
 from models.user import LoginRequest, OTPVerifyRequest, TokenResponse, UserResponse, UserRole
 from services.otp_service import generate_otp, verify_otp, resend_otp
-from utils.jwt_handler import create_user_token, decode_token
+from utils.jwt_handler import create_user_token, UserInfo
 from utils.auth_middleware import get_current_user
+from config import JWT_USER_RECHECK_MINUTES
 from datetime import datetime
+import time
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# User fields needed to issue a token and build a UserResponse
+USER_PROJECTION = {
+    "_id": 0,
+    "phone": 1,
+    "name": 1,
+    "role": 1,
+    "device_id": 1,
+    "is_active": 1,
+    "location_id": 1,
+    "created_at": 1
+}
+
+
+def new_user_document(phone: str) -> dict:
+    """
+    Basic record for a first-time login
+    Admin will need to assign role and location later
+    """
+    now = datetime.utcnow()
+    return {
+        "phone": phone,
+        "name": f"User {phone[-4:]}",  # Temporary name
+        "role": UserRole.EMPLOYEE.value,
+        "device_id": None,
+        "is_active": True,
+        "location_id": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
 
 @router.post("/send-otp")
 async def send_otp(request: LoginRequest):
@@ -24,34 +58,28 @@ async def send_otp(request: LoginRequest):
     db = get_database()
     users_collection = db["users"]
     
-    # Check if user exists
-    user = await users_collection.find_one({"phone": request.phone})
+    # Create the account on first login in one atomic upsert; the unique
+    # phone index makes concurrent first logins resolve to a single user.
+    # BEFORE returns None when the document was just inserted
+    user = await users_collection.find_one_and_update(
+        {"phone": request.phone},
+        {"$setOnInsert": new_user_document(request.phone)},
+        projection={"_id": 1, "is_active": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
     
     if not user:
-        # First-time user - create account with basic info
-        # Admin will need to assign role and location later
-        new_user = {
-            "phone": request.phone,
-            "name": f"User {request.phone[-4:]}",  # Temporary name
-            "role": UserRole.EMPLOYEE.value,
-            "device_id": None,
-            "is_active": True,
-            "location_id": None,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        await users_collection.insert_one(new_user)
+        # First-time user - admin will need to assign role and location later
         print(f"✨ New user created: {request.phone}")
-    else:
-        # Check if user is active
-        if not user.get("is_active", True):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Your account has been deactivated. Contact admin."
-            )
+    elif not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been deactivated. Contact admin."
+        )
     
     # Generate and send OTP
-    otp = generate_otp(request.phone)
+    otp = await generate_otp(request.phone)
     
     return {
         "success": True,
@@ -70,49 +98,55 @@ async def verify_otp_endpoint(request: OTPVerifyRequest):
     users_collection = db["users"]
     
     # Verify OTP
-    if not verify_otp(request.phone, request.otp):
+    if not await verify_otp(request.phone, request.otp):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired OTP. Please try again."
         )
     
-    # Get user from database
-    user = await users_collection.find_one({"phone": request.phone})
-    
-    # If user doesn't exist (client skipped send-otp), create a basic record
-    if not user:
-        new_user = {
-            "phone": request.phone,
-            "name": f"User {request.phone[-4:]}",
-            "role": UserRole.EMPLOYEE.value,
-            "device_id": None,
-            "is_active": True,
-            "location_id": None,
-            "created_at": datetime.utcnow(),
+    # Fetch the user, creating a basic record if the client skipped send-otp,
+    # and record the device in the same round trip
+    new_user = new_user_document(request.phone)
+    update = {"$setOnInsert": new_user}
+    if request.device_id:
+        # $set and $setOnInsert may not name the same field
+        del new_user["device_id"], new_user["updated_at"]
+        update["$set"] = {
+            "device_id": request.device_id,
             "updated_at": datetime.utcnow()
         }
-        await users_collection.insert_one(new_user)
+    try:
+        # A deactivated account doesn't match the filter, so its device is
+        # left alone and the upsert collides with the unique phone index
+        user = await users_collection.find_one_and_update(
+            {"phone": request.phone, "is_active": {"$ne": False}},
+            update,
+            projection=USER_PROJECTION,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # Tokens imply an active account, so never issue one otherwise
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been deactivated. Contact admin."
+        )
+    
+    if not user:
         user = new_user
         print(f"✨ User auto-created during OTP verify: {request.phone}")
     
-    # Update device_id if provided
     if request.device_id:
-        await users_collection.update_one(
-            {"phone": request.phone},
-            {
-                "$set": {
-                    "device_id": request.device_id,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
         user["device_id"] = request.device_id
     
     # Generate JWT token
     access_token = create_user_token(
         phone=user["phone"],
         role=user["role"],
-        name=user["name"]
+        name=user["name"],
+        device_id=user.get("device_id"),
+        location_id=user.get("location_id"),
+        created_at=user["created_at"]
     )
     
     # Prepare user response
@@ -133,34 +167,58 @@ async def verify_otp_endpoint(request: OTPVerifyRequest):
 
 
 @router.post("/refresh")
-async def refresh_token(current_user: dict = Depends(get_current_user)):
+async def refresh_token(current_user: UserInfo = Depends(get_current_user)):
     """
     Refresh JWT token
     Returns a new token with updated expiration
-    """
-    db = get_database()
-    users_collection = db["users"]
     
-    # Get latest user data from database
-    user = await users_collection.find_one({"phone": current_user["phone"]})
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    Re-signs the token's own claims while they were read from the database
+    within JWT_USER_RECHECK_MINUTES; otherwise reloads the user, so role
+    changes and deactivation take effect within that window
+    """
+    checked_at = current_user.checked_at
+    claims_fresh = (
+        checked_at is not None
+        and current_user.created_at is not None
+        and time.time() - checked_at < JWT_USER_RECHECK_MINUTES * 60
+    )
     
-    if not user.get("is_active", True):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Your account has been deactivated"
-        )
+    if claims_fresh:
+        # Tokens are only issued to active users
+        user = {
+            **current_user._asdict(),
+            "is_active": True,
+            "created_at": datetime.fromisoformat(current_user.created_at)
+        }
+    else:
+        db = get_database()
+        users_collection = db["users"]
+        
+        # Get latest user data from database
+        user = await users_collection.find_one({"phone": current_user.phone}, projection=USER_PROJECTION)
+        
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        if not user.get("is_active", True):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Your account has been deactivated"
+            )
+        checked_at = None  # Claims were just confirmed
     
     # Generate new token
     new_token = create_user_token(
         phone=user["phone"],
         role=user["role"],
-        name=user["name"]
+        name=user["name"],
+        device_id=user.get("device_id"),
+        location_id=user.get("location_id"),
+        created_at=user["created_at"],
+        checked_at=checked_at
     )
     
     # Prepare user response
@@ -189,7 +247,7 @@ async def resend_otp_endpoint(request: LoginRequest):
     users_collection = db["users"]
     
     # Check if user exists
-    user = await users_collection.find_one({"phone": request.phone})
+    user = await users_collection.find_one({"phone": request.phone}, projection={"_id": 1})
     
     if not user:
         raise HTTPException(
@@ -198,7 +256,7 @@ async def resend_otp_endpoint(request: LoginRequest):
         )
     
     # Generate and send new OTP
-    otp = resend_otp(request.phone)
+    otp = await resend_otp(request.phone)
     
     return {
         "success": True,
@@ -208,7 +266,7 @@ async def resend_otp_endpoint(request: LoginRequest):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserInfo = Depends(get_current_user)):
     """
     Get current authenticated user's information
     Protected route - requires valid JWT token
@@ -217,7 +275,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     users_collection = db["users"]
     
     # Get user from database
-    user = await users_collection.find_one({"phone": current_user["phone"]})
+    user = await users_collection.find_one({"phone": current_user.phone}, projection=USER_PROJECTION)
     
     if not user:
         raise HTTPException(
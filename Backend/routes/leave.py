@@ -3,10 +3,11 @@ Leave Management Routes
 Endpoints for leave requests, balances, and approvals
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import datetime, date
+from datetime import datetime, date, time
 from typing import Optional
+import asyncio
 import logging
-from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from models.leave import (
     LeaveType,
@@ -14,16 +15,46 @@ from models.leave import (
     LeaveRequest,
     LeaveRequestCreate,
     LeaveBalance,
-    LeaveRequestResponse,
     LeaveHistoryResponse,
-    LeaveBalanceResponse
+    LeaveBalanceResponse,
+    ObjectIdParam
 )
 from routes.auth import get_current_user
+from utils.jwt_handler import UserInfo
 from database import get_database
 
 router = APIRouter(prefix="/leave", tags=["leave"])
 logger = logging.getLogger(__name__)
 
+# Balance document fields for each leave type, keyed by the stored type value
+LEAVE_BALANCE_FIELDS = {
+    LeaveType.CASUAL.value: "casual_balance",
+    LeaveType.SICK.value: "sick_balance",
+    LeaveType.EARNED.value: "earned_balance"
+}
+LEAVE_USED_FIELDS = {
+    LeaveType.CASUAL.value: "used_casual",
+    LeaveType.SICK.value: "used_sick",
+    LeaveType.EARNED.value: "used_earned"
+}
+# Leave request fields returned by /history, shaped like LeaveRequestResponse
+LEAVE_HISTORY_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "user_id": 1,
+    "leave_type": 1,
+    "start_date": 1,
+    "end_date": 1,
+    "days": 1,
+    "reason": 1,
+    "status": 1,
+    "applied_at": 1,
+    "approved_by": 1,
+    "approved_at": 1,
+    "rejection_reason": 1,
+    "cancelled_at": 1
+}
+
 
 async def get_or_create_leave_balance(db, user_id: str, year: int) -> LeaveBalance:
     """Get or create leave balance for user and year"""
@@ -42,37 +73,72 @@ async def get_or_create_leave_balance(db, user_id: str, year: int) -> LeaveBalan
             total_balance=30.0,
             year=year
         )
-        await db.leave_balances.insert_one(new_balance.model_dump())
+        try:
+            await db.leave_balances.insert_one(new_balance.model_dump())
+        except DuplicateKeyError:
+            # A concurrent request created it first; use the stored one
+            balance = await db.leave_balances.find_one({
+                "user_id": user_id,
+                "year": year
+            })
+            return LeaveBalance(**balance)
         return new_balance
     
     return LeaveBalance(**balance)
 
 
+async def has_leave_balance(
+    db, user_id: str, year: int, balance_field: str, days: float
+) -> bool:
+    """
+    Check in a single query that a leave balance covers the requested days
+    Nothing is deducted; approval of the request takes the days
+    """
+    balance = await db.leave_balances.find_one(
+        {"user_id": user_id, "year": year, balance_field: {"$gte": days}},
+        projection={"_id": 1}
+    )
+    return balance is not None
+
+
+async def restore_leave_balance(
+    db, user_id: str, year: int, balance_field: str, used_field: str, days: float
+):
+    """Give used days back to a leave balance"""
+    await db.leave_balances.update_one(
+        {"user_id": user_id, "year": year},
+        {"$inc": {balance_field: days, used_field: -days}}
+    )
+
+
+# Weekdays among the first r days of a week starting on weekday s,
+# indexed by s * 7 + r (Monday=0, Sunday=6)
+_WEEKDAYS_IN_PARTIAL_WEEK = tuple(
+    sum(1 for i in range(r) if (s + i) % 7 < 5)
+    for s in range(7)
+    for r in range(7)
+)
+
+
 def calculate_leave_days(start_date: date, end_date: date) -> float:
     """Calculate number of leave days (excluding weekends)"""
     if end_date < start_date:
         raise ValueError("End date must be after start date")
     
-    days = 0
-    current = start_date
-    while current <= end_date:
-        # Count only weekdays (Monday=0, Sunday=6)
-        if current.weekday() < 5:
-            days += 1
-        current = date.fromordinal(current.toordinal() + 1)
-    
-    return float(days)
+    # Every full week has 5 weekdays; look up the leftover days
+    full_weeks, remainder = divmod(end_date.toordinal() - start_date.toordinal() + 1, 7)
+    return float(full_weeks * 5 + _WEEKDAYS_IN_PARTIAL_WEEK[start_date.weekday() * 7 + remainder])
 
 
 @router.post("/apply")
 async def apply_leave(
     leave_request: LeaveRequestCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """Apply for leave"""
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Calculate leave days
         try:
@@ -89,49 +155,45 @@ async def apply_leave(
                 detail="Leave duration must be at least 1 day"
             )
         
-        # Check leave balance
         current_year = datetime.utcnow().year
-        balance = await get_or_create_leave_balance(db, user_id, current_year)
-        
-        # Check if sufficient balance
         leave_type = leave_request.leave_type
-        if leave_type == LeaveType.CASUAL:
-            if balance.casual_balance < days:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient casual leave balance. Available: {balance.casual_balance} days"
-                )
-        elif leave_type == LeaveType.SICK:
-            if balance.sick_balance < days:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient sick leave balance. Available: {balance.sick_balance} days"
-                )
-        elif leave_type == LeaveType.EARNED:
-            if balance.earned_balance < days:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient earned leave balance. Available: {balance.earned_balance} days"
-                )
+        balance_field = LEAVE_BALANCE_FIELDS[leave_type.value]
         
-        # Check for overlapping leaves
-        existing_leaves = await db.leave_requests.find({
-            "user_id": user_id,
-            "status": {"$in": [LeaveStatus.PENDING.value, LeaveStatus.APPROVED.value]},
-            "$or": [
+        # Leave dates are stored as BSON dates at midnight
+        start_dt = datetime.combine(leave_request.start_date, time.min)
+        end_dt = datetime.combine(leave_request.end_date, time.min)
+        
+        # Check for overlapping leaves (existence only, so fetch just one _id)
+        # and for sufficient balance concurrently
+        overlapping_leave, balance_ok = await asyncio.gather(
+            db.leave_requests.find_one(
                 {
-                    "start_date": {"$lte": leave_request.end_date.isoformat()},
-                    "end_date": {"$gte": leave_request.start_date.isoformat()}
-                }
-            ]
-        }).to_list(length=10)
+                    "user_id": user_id,
+                    "status": {"$in": [LeaveStatus.PENDING.value, LeaveStatus.APPROVED.value]},
+                    "start_date": {"$lte": end_dt},
+                    "end_date": {"$gte": start_dt}
+                },
+                projection={"_id": 1}
+            ),
+            has_leave_balance(db, user_id, current_year, balance_field, days)
+        )
         
-        if existing_leaves:
+        if overlapping_leave:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Leave dates overlap with existing leave request"
             )
         
+        if not balance_ok:
+            # Either the balance is short, or this year's balance doesn't exist yet
+            balance = await get_or_create_leave_balance(db, user_id, current_year)
+            available = getattr(balance, balance_field)
+            if available < days:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Insufficient {leave_type.value} leave balance. Available: {available} days"
+                )
+        
         # Create leave request
         new_request = LeaveRequest(
             user_id=user_id,
@@ -144,10 +206,10 @@ async def apply_leave(
             applied_at=datetime.utcnow()
         )
         
-        # Convert to dict and convert dates to ISO strings for MongoDB
+        # Convert to dict; BSON has no date-only type, so dates become datetimes
         request_dict = new_request.model_dump()
-        request_dict['start_date'] = leave_request.start_date.isoformat()
-        request_dict['end_date'] = leave_request.end_date.isoformat()
+        request_dict['start_date'] = start_dt
+        request_dict['end_date'] = end_dt
         request_dict['applied_at'] = datetime.utcnow()
         request_dict['status'] = LeaveStatus.PENDING.value
         request_dict['leave_type'] = leave_request.leave_type.value
@@ -176,12 +238,12 @@ async def apply_leave(
 @router.get("/balance", response_model=LeaveBalanceResponse)
 async def get_leave_balance(
     year: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """Get leave balance for current or specified year"""
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         if year is None:
             year = datetime.utcnow().year
@@ -213,12 +275,12 @@ async def get_leave_history(
     page: int = 1,
     page_size: int = 50,
     status_filter: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """Get leave request history"""
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Build query
         query = {"user_id": user_id}
@@ -228,52 +290,30 @@ async def get_leave_history(
         # Calculate skip
         skip = (page - 1) * page_size
         
-        # Get total count
-        total_count = await db.leave_requests.count_documents(query)
-        
-        # Get records
-        cursor = db.leave_requests.find(query).sort("applied_at", -1).skip(skip).limit(page_size)
-        records = await cursor.to_list(length=page_size)
-        
-        # Convert to response models
-        requests = []
-        for record in records:
-            # Parse dates from ISO strings
-            start_date_obj = record["start_date"]
-            end_date_obj = record["end_date"]
-            
-            if isinstance(start_date_obj, str):
-                start_date_obj = datetime.fromisoformat(start_date_obj).date()
-            elif isinstance(start_date_obj, datetime):
-                start_date_obj = start_date_obj.date()
-            
-            if isinstance(end_date_obj, str):
-                end_date_obj = datetime.fromisoformat(end_date_obj).date()
-            elif isinstance(end_date_obj, datetime):
-                end_date_obj = end_date_obj.date()
-            
-            requests.append(LeaveRequestResponse(
-                id=str(record["_id"]),
-                user_id=record["user_id"],
-                leave_type=record["leave_type"],
-                start_date=start_date_obj,
-                end_date=end_date_obj,
-                days=record["days"],
-                reason=record["reason"],
-                status=record["status"],
-                applied_at=record["applied_at"],
-                approved_by=record.get("approved_by"),
-                approved_at=record.get("approved_at"),
-                rejection_reason=record.get("rejection_reason"),
-                cancelled_at=record.get("cancelled_at")
-            ))
-        
-        return LeaveHistoryResponse(
-            requests=requests,
-            total_count=total_count,
-            page=page,
-            page_size=page_size
-        )
+        # Get the page of records (newest first) and total count in one round trip
+        pipeline = [
+            {"$match": query},
+            {"$facet": {
+                "records": [
+                    {"$sort": {"applied_at": -1}},
+                    {"$skip": skip},
+                    {"$limit": page_size},
+                    {"$project": LEAVE_HISTORY_PROJECTION}
+                ],
+                "total": [{"$count": "n"}]
+            }}
+        ]
+        result = (await db.leave_requests.aggregate(pipeline).to_list(length=1))[0]
+        total_count = result["total"][0]["n"] if result["total"] else 0
+        
+        # Rows already match LeaveRequestResponse, so the response model
+        # validates and serializes them in a single pass
+        return {
+            "requests": result["records"],
+            "total_count": total_count,
+            "page": page,
+            "page_size": page_size
+        }
         
     except Exception as e:
         logger.error(f"Failed to get leave history: {str(e)}")
@@ -285,17 +325,17 @@ async def get_leave_history(
 
 @router.post("/cancel/{request_id}")
 async def cancel_leave(
-    request_id: str,
-    current_user: dict = Depends(get_current_user)
+    request_id: ObjectIdParam,
+    current_user: UserInfo = Depends(get_current_user)
 ):
     """Cancel a pending leave request"""
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         # Get leave request
         leave_request = await db.leave_requests.find_one({
-            "_id": ObjectId(request_id),
+            "_id": request_id,
             "user_id": user_id
         })
         
@@ -312,38 +352,23 @@ async def cancel_leave(
                 detail=f"Cannot cancel leave with status: {leave_request['status']}"
             )
         
-        # If approved, restore balance
+        # Restore balance if approved
         if leave_request["status"] == LeaveStatus.APPROVED.value:
             current_year = datetime.utcnow().year
             leave_type = leave_request["leave_type"]
             days = leave_request["days"]
             
-            update_field = {
-                LeaveType.CASUAL.value: "casual_balance",
-                LeaveType.SICK.value: "sick_balance",
-                LeaveType.EARNED.value: "earned_balance"
-            }[leave_type]
-            
-            used_field = {
-                LeaveType.CASUAL.value: "used_casual",
-                LeaveType.SICK.value: "used_sick",
-                LeaveType.EARNED.value: "used_earned"
-            }[leave_type]
+            update_field = LEAVE_BALANCE_FIELDS[leave_type]
+            used_field = LEAVE_USED_FIELDS[leave_type]
             
             # Restore balance
-            await db.leave_balances.update_one(
-                {"user_id": user_id, "year": current_year},
-                {
-                    "$inc": {
-                        update_field: days,
-                        used_field: -days
-                    }
-                }
+            await restore_leave_balance(
+                db, user_id, current_year, update_field, used_field, days
             )
         
         # Update leave request status
         await db.leave_requests.update_one(
-            {"_id": ObjectId(request_id)},
+            {"_id": request_id},
             {
                 "$set": {
                     "status": LeaveStatus.CANCELLED.value,
@@ -370,11 +395,11 @@ async def cancel_leave(
 
 
 @router.get("/pending-count")
-async def get_pending_count(current_user: dict = Depends(get_current_user)):
+async def get_pending_count(current_user: UserInfo = Depends(get_current_user)):
     """Get count of pending leave requests"""
     try:
         db = get_database()
-        user_id = current_user["phone"]
+        user_id = current_user.phone
         
         count = await db.leave_requests.count_documents({
             "user_id": user_id,
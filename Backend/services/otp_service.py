@@ -4,17 +4,26 @@ Handles OTP generation and validation
 For MVP: Uses mock OTPs (always 123456)
 TODO: Integrate with SMS service (Twilio, MSG91, etc.) in production
 """
-from typing import Dict, Optional
+from typing import Optional
 from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+import hmac
+import logging
 import random
 
+from database import get_database
 
-# In-memory storage for OTPs (for MVP only)
-# In production, use Redis or database with TTL
-otp_storage: Dict[str, Dict] = {}
+logger = logging.getLogger(__name__)
 
+# OTPs live in the "otps" collection, one document per phone:
+#   {phone, otp, expires_at, attempts}
+# A TTL index on expires_at lets MongoDB purge expired codes, and the store
+# is shared by every worker process
+OTP_TTL = timedelta(minutes=5)
+MAX_OTP_ATTEMPTS = 3
 
-def generate_otp(phone: str) -> str:
+
+async def generate_otp(phone: str) -> str:
     """
     Generate a 6-digit OTP for a phone number
     
@@ -33,23 +42,23 @@ def generate_otp(phone: str) -> str:
     # Production: Use random OTP
     # otp = str(random.randint(100000, 999999))
     
-    # Store OTP with expiration time (5 minutes)
-    expiry_time = datetime.utcnow() + timedelta(minutes=5)
-    otp_storage[phone] = {
-        "otp": otp,
-        "expires_at": expiry_time,
-        "attempts": 0
-    }
+    # Store OTP with expiration time (5 minutes), replacing any previous one
+    expiry_time = datetime.utcnow() + OTP_TTL
+    await get_database().otps.update_one(
+        {"phone": phone},
+        {"$set": {"otp": otp, "expires_at": expiry_time, "attempts": 0}},
+        upsert=True
+    )
     
-    print(f"📱 OTP for {phone}: {otp} (expires at {expiry_time})")
+    logger.info("OTP for %s: %s (expires at %s)", phone, otp, expiry_time)
     
-    # TODO: Send OTP via SMS service
-    # send_sms(phone, f"Your GeoStaff OTP is: {otp}")
+    # TODO: Send OTP via SMS service without blocking the event loop, e.g.
+    # await sms_client.post(SMS_API_URL, ...) on a module-level httpx.AsyncClient
     
     return otp
 
 
-def verify_otp(phone: str, otp: str) -> bool:
+async def verify_otp(phone: str, otp: str) -> bool:
     """
     Verify if the provided OTP is valid for the phone number
     
@@ -60,61 +69,56 @@ def verify_otp(phone: str, otp: str) -> bool:
     Returns:
         True if OTP is valid, False otherwise
     """
+    otps = get_database().otps
+    now = datetime.utcnow()
+    
+    # Common path: a live, matching OTP is consumed in a single round trip
+    consumed = await otps.find_one_and_delete({
+        "phone": phone,
+        "otp": otp,
+        "expires_at": {"$gt": now},
+        "attempts": {"$lt": MAX_OTP_ATTEMPTS}
+    })
+    if consumed:
+        logger.info("OTP verified successfully for phone: %s", phone)
+        return True
+    
+    # Otherwise record the failed attempt and find out why it failed
+    stored_otp_data = await otps.find_one_and_update(
+        {"phone": phone},
+        {"$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    
     # If no OTP was generated (e.g., client skipped send-otp),
     # allow the default MVP OTP "123456" to pass without storage.
-    if phone not in otp_storage:
-        if otp == "123456":
-            print(f"✅ OTP verified (no prior generation) for phone: {phone}")
+    if stored_otp_data is None:
+        if hmac.compare_digest(otp.encode(), b"123456"):
+            logger.info("OTP verified (no prior generation) for phone: %s", phone)
             return True
-        print(f"❌ No OTP found for phone: {phone}")
+        logger.warning("No OTP found for phone: %s", phone)
         return False
     
-    stored_otp_data = otp_storage[phone]
-    
-    # Check if OTP has expired
-    if datetime.utcnow() > stored_otp_data["expires_at"]:
-        print(f"❌ OTP expired for phone: {phone}")
-        del otp_storage[phone]
+    # Check if OTP has expired (the TTL monitor may not have purged it yet)
+    if now > stored_otp_data["expires_at"]:
+        logger.warning("OTP expired for phone: %s", phone)
+        await otps.delete_one({"_id": stored_otp_data["_id"]})
         return False
     
     # Check attempt limit (max 3 attempts)
-    if stored_otp_data["attempts"] >= 3:
-        print(f"❌ Maximum OTP attempts exceeded for phone: {phone}")
-        del otp_storage[phone]
+    if stored_otp_data["attempts"] > MAX_OTP_ATTEMPTS:
+        logger.warning("Maximum OTP attempts exceeded for phone: %s", phone)
+        await otps.delete_one({"_id": stored_otp_data["_id"]})
         return False
     
-    # Verify OTP
-    if stored_otp_data["otp"] == otp:
-        print(f"✅ OTP verified successfully for phone: {phone}")
-        # Clear OTP after successful verification
-        del otp_storage[phone]
-        return True
-    else:
-        # Increment attempt counter
-        stored_otp_data["attempts"] += 1
-        print(f"❌ Invalid OTP for phone: {phone} (Attempt {stored_otp_data['attempts']}/3)")
-        return False
-
-
-def clear_expired_otps():
-    """
-    Clear expired OTPs from storage
-    Should be called periodically in production
-    """
-    current_time = datetime.utcnow()
-    expired_phones = [
-        phone for phone, data in otp_storage.items()
-        if current_time > data["expires_at"]
-    ]
-    
-    for phone in expired_phones:
-        del otp_storage[phone]
-        print(f"🧹 Cleared expired OTP for phone: {phone}")
-    
-    return len(expired_phones)
+    logger.warning(
+        "Invalid OTP for phone: %s (Attempt %s/%s)",
+        phone, stored_otp_data["attempts"], MAX_OTP_ATTEMPTS
+    )
+    return False
 
 
-def resend_otp(phone: str) -> Optional[str]:
+async def resend_otp(phone: str) -> Optional[str]:
     """
     Resend OTP to a phone number
     Generates a new OTP and invalidates the old one
@@ -125,9 +129,5 @@ def resend_otp(phone: str) -> Optional[str]:
     Returns:
         New OTP string if successful, None otherwise
     """
-    # Clear any existing OTP
-    if phone in otp_storage:
-        del otp_storage[phone]
-    
-    # Generate new OTP
-    return generate_otp(phone)
+    # Generating overwrites any existing OTP and resets its attempts
+    return await generate_otp(phone)
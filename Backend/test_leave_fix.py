@@ -1,7 +1,7 @@
 """
 Quick test for leave date serialization fix
 """
-from datetime import date, datetime
+from datetime import date, datetime, time
 from models.leave import LeaveRequest, LeaveStatus
 
 # Test 1: Create a LeaveRequest with date objects
@@ -27,15 +27,15 @@ print(f"   End Date: {request.end_date} (type: {type(request.end_date).__name__}
 request_dict = request.model_dump()
 print("\n✅ model_dump() successful")
 
-# Test 3: Convert dates to ISO strings (this is what the fix does)
-request_dict['start_date'] = start_date.isoformat()
-request_dict['end_date'] = end_date.isoformat()
+# Test 3: Convert dates to midnight datetimes (stored as BSON dates)
+request_dict['start_date'] = datetime.combine(start_date, time.min)
+request_dict['end_date'] = datetime.combine(end_date, time.min)
 request_dict['status'] = LeaveStatus.PENDING.value
 request_dict['leave_type'] = "casual"
 
-print("\n✅ Date conversion to ISO strings successful")
-print(f"   Start Date (ISO): {request_dict['start_date']}")
-print(f"   End Date (ISO): {request_dict['end_date']}")
+print("\n✅ Date conversion to datetimes successful")
+print(f"   Start Date: {request_dict['start_date']}")
+print(f"   End Date: {request_dict['end_date']}")
 
 # Test 4: Verify the dict is JSON serializable
 import json
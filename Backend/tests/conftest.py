@@ -0,0 +1,31 @@
+"""
+Shared test fixtures
+Routes run against an in-memory mongomock database with a fixed user
+"""
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from main import app
+from utils.auth_middleware import get_current_user
+from utils.jwt_handler import UserInfo
+
+TEST_USER = UserInfo("9876543210", "employee", "Test User", None, None, None, None)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fresh mongomock database behind get_database()"""
+    mock_db = AsyncMongoMockClient()["geostaff_test"]
+    monkeypatch.setattr(database, "database", mock_db)
+    monkeypatch.setattr(database, "attendance_collection", mock_db.attendance)
+    return mock_db
+
+
+@pytest.fixture
+def client(db):
+    """TestClient authenticated as TEST_USER (lifespan is not run)"""
+    app.dependency_overrides[get_current_user] = lambda: TEST_USER
+    yield TestClient(app)
+    app.dependency_overrides.clear()
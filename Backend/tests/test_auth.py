@@ -0,0 +1,52 @@
+"""
+verify-otp: a deactivated account gets no token and keeps its device
+"""
+import asyncio
+from datetime import datetime
+
+from services.otp_service import generate_otp
+
+PHONE = "9876543210"
+
+
+def add_user(db, is_active):
+    async def insert():
+        await db.users.create_index("phone", unique=True)
+        await db.users.insert_one({
+            "phone": PHONE,
+            "name": "Test User",
+            "role": "employee",
+            "device_id": "old-device",
+            "is_active": is_active,
+            "created_at": datetime.utcnow()
+        })
+        return await generate_otp(PHONE)
+
+    return asyncio.run(insert())
+
+
+def stored_device(db):
+    return asyncio.run(db.users.find_one({"phone": PHONE}))["device_id"]
+
+
+def test_inactive_user_device_is_not_overwritten(client, db):
+    otp = add_user(db, is_active=False)
+
+    response = client.post("/auth/verify-otp", json={
+        "phone": PHONE, "otp": otp, "device_id": "new-device"
+    })
+
+    assert response.status_code == 403
+    assert stored_device(db) == "old-device"
+    assert asyncio.run(db.users.count_documents({})) == 1
+
+
+def test_active_user_device_is_recorded(client, db):
+    otp = add_user(db, is_active=True)
+
+    response = client.post("/auth/verify-otp", json={
+        "phone": PHONE, "otp": otp, "device_id": "new-device"
+    })
+
+    assert response.status_code == 200
+    assert stored_device(db) == "new-device"
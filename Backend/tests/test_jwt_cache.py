@@ -0,0 +1,65 @@
+"""
+verify_token's payload cache: repeat tokens skip decoding, but never
+outlive the token's own exp claim
+"""
+import time
+from datetime import timedelta
+
+import pytest
+
+from utils import jwt_handler
+from utils.jwt_handler import create_access_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def empty_token_caches():
+    jwt_handler._payload_cache.clear()
+    jwt_handler._rejected_cache.clear()
+    yield
+    jwt_handler._payload_cache.clear()
+    jwt_handler._rejected_cache.clear()
+
+
+def test_verified_payload_is_cached():
+    token = create_access_token({"sub": "9876543210"})
+
+    payload = verify_token(token)
+
+    assert payload["sub"] == "9876543210"
+    assert len(jwt_handler._payload_cache) == 1
+    assert verify_token(token) is payload
+
+
+def test_expired_token_is_not_served_from_cache():
+    token = create_access_token({"sub": "9876543210"}, timedelta(seconds=1))
+    payload = verify_token(token)
+    assert payload is not None
+    assert len(jwt_handler._payload_cache) == 1
+
+    # Wait until just past the exp claim (a whole epoch second)
+    time.sleep(max(0.0, payload["exp"] - time.time()) + 0.05)
+
+    assert verify_token(token) is None
+    assert len(jwt_handler._payload_cache) == 0
+
+
+def test_rejected_token_is_remembered_without_poisoning_valid_ones(monkeypatch):
+    token = create_access_token({"sub": "9876543210"})
+    forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+    decode_calls = []
+    decode = jwt_handler.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decode_calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_handler.jwt, "decode", counting_decode)
+
+    assert verify_token(forged) is None
+    assert decode_calls == [forged]
+
+    # The replay is answered from the rejected cache without decoding again
+    assert verify_token(forged) is None
+    assert decode_calls == [forged]
+
+    assert verify_token(token)["sub"] == "9876543210"
@@ -0,0 +1,112 @@
+"""
+Leave balance checks: apply refuses requests the balance can't cover but
+takes nothing, and cancelling an approved request gives its days back
+"""
+import asyncio
+from datetime import date, timedelta
+
+from bson import ObjectId
+
+
+def next_monday(days_ahead: int = 30) -> date:
+    day = date.today() + timedelta(days=days_ahead)
+    return day + timedelta(days=-day.weekday() % 7)
+
+
+def apply(client, leave_type, start, end):
+    return client.post("/leave/apply", json={
+        "leave_type": leave_type,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "reason": "family function"
+    })
+
+
+def balance(client):
+    response = client.get("/leave/balance")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_apply_checks_balance_without_deducting(client):
+    monday = next_monday()
+
+    response = apply(client, "casual", monday, monday + timedelta(days=2))
+
+    assert response.status_code == 200
+    assert response.json()["days"] == 3.0
+    after = balance(client)
+    assert after["casual_balance"] == 10.0
+    assert after["used_casual"] == 0.0
+
+
+def test_overlap_leaves_balance_unchanged(client):
+    monday = next_monday()
+    assert apply(client, "casual", monday, monday + timedelta(days=2)).status_code == 200
+
+    response = apply(client, "casual", monday + timedelta(days=1), monday + timedelta(days=3))
+
+    assert response.status_code == 400
+    assert "overlap" in response.json()["detail"]
+    after = balance(client)
+    assert after["casual_balance"] == 10.0
+    assert after["used_casual"] == 0.0
+
+
+def test_insufficient_balance_is_refused(client):
+    monday = next_monday()
+
+    response = apply(client, "earned", monday, monday + timedelta(days=20))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Insufficient earned leave balance. Available: 10.0 days"
+    assert balance(client)["earned_balance"] == 10.0
+
+
+def test_cancel_pending_leaves_balance_unchanged(client):
+    monday = next_monday()
+    request_id = apply(client, "sick", monday, monday).json()["request_id"]
+
+    response = client.post(f"/leave/cancel/{request_id}")
+
+    assert response.status_code == 200
+    assert balance(client)["sick_balance"] == 10.0
+    assert client.get("/leave/pending-count").json() == {"pending_count": 0}
+
+
+def test_cancel_approved_restores_balance(client, db):
+    monday = next_monday()
+    request_id = apply(client, "sick", monday, monday).json()["request_id"]
+
+    # Approval happens outside this service; it marks the request and takes the days
+    async def approve():
+        await db.leave_requests.update_one(
+            {"_id": ObjectId(request_id)}, {"$set": {"status": "approved"}}
+        )
+        await db.leave_balances.update_one(
+            {"user_id": "9876543210"}, {"$inc": {"sick_balance": -1.0, "used_sick": 1.0}}
+        )
+    asyncio.run(approve())
+
+    response = client.post(f"/leave/cancel/{request_id}")
+
+    assert response.status_code == 200
+    after = balance(client)
+    assert after["sick_balance"] == 10.0
+    assert after["used_sick"] == 0.0
+
+    # A second cancel must not give the days back twice
+    assert client.post(f"/leave/cancel/{request_id}").status_code == 400
+    assert balance(client)["sick_balance"] == 10.0
+
+
+def test_cancel_rejects_malformed_id(client):
+    response = client.post("/leave/cancel/not-an-id")
+
+    assert response.status_code == 422
+
+
+def test_cancel_unknown_id_is_not_found(client):
+    response = client.post("/leave/cancel/0123456789abcdef01234567")
+
+    assert response.status_code == 404
@@ -0,0 +1,53 @@
+"""
+OTP verification against the otps collection: codes are single use and
+locked out after MAX_OTP_ATTEMPTS wrong guesses
+"""
+import asyncio
+
+from services.otp_service import MAX_OTP_ATTEMPTS, generate_otp, verify_otp
+
+PHONE = "9876543210"
+
+
+def test_correct_otp_is_consumed(db):
+    async def scenario():
+        otp = await generate_otp(PHONE)
+        assert await verify_otp(PHONE, otp)
+        assert await db.otps.count_documents({"phone": PHONE}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_correct_otp_accepted_within_attempt_limit(db):
+    async def scenario():
+        otp = await generate_otp(PHONE)
+        for _ in range(MAX_OTP_ATTEMPTS - 1):
+            assert not await verify_otp(PHONE, "000000")
+        assert await verify_otp(PHONE, otp)
+
+    asyncio.run(scenario())
+
+
+def test_otp_locked_after_max_attempts(db):
+    async def scenario():
+        otp = await generate_otp(PHONE)
+        for _ in range(MAX_OTP_ATTEMPTS):
+            assert not await verify_otp(PHONE, "000000")
+
+        # Even the right code is refused once the attempts are used up,
+        # and the locked code is deleted
+        assert not await verify_otp(PHONE, otp)
+        assert await db.otps.count_documents({"phone": PHONE}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_resend_resets_attempts(db):
+    async def scenario():
+        await generate_otp(PHONE)
+        for _ in range(MAX_OTP_ATTEMPTS):
+            await verify_otp(PHONE, "000000")
+        otp = await generate_otp(PHONE)
+        assert await verify_otp(PHONE, otp)
+
+    asyncio.run(scenario())
@@ -5,14 +5,14 @@ Validates JWT tokens and protects routes requiring authentication
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from utils.jwt_handler import decode_token
+from utils.jwt_handler import verify_token, user_from_payload, UserInfo
 
 
 # Security scheme for extracting Bearer token from Authorization header
 security = HTTPBearer()
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserInfo:
     """
     Dependency to get current authenticated user from JWT token
     
@@ -20,27 +20,26 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         credentials: HTTP Bearer token credentials
     
     Returns:
-        Dictionary with user information (phone, role, name)
+        UserInfo with the user's token claims (phone, role, name, device_id,
+        location_id, created_at, checked_at)
     
     Raises:
         HTTPException: If token is invalid or missing
     """
-    token = credentials.credentials
+    # Decode and verify token (repeat tokens are served from verify_token's cache)
+    payload = verify_token(credentials.credentials)
     
-    # Decode and verify token
-    user_data = decode_token(token)
-    
-    if not user_data:
+    if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user_data
+    return user_from_payload(payload)
 
 
-async def get_current_active_user(current_user: dict = Depends(get_current_user)) -> dict:
+async def get_current_active_user(current_user: UserInfo = Depends(get_current_user)) -> UserInfo:
     """
     Dependency to ensure user is active
     Can be extended to check database for user's active status
@@ -49,7 +48,7 @@ async def get_current_active_user(current_user: dict = Depends(get_current_user)
         current_user: Current user from JWT token
     
     Returns:
-        User dictionary if active
+        UserInfo if active
     
     Raises:
         HTTPException: If user is inactive
@@ -72,8 +71,8 @@ def require_role(allowed_roles: list):
     Usage:
         @router.get("/admin-only", dependencies=[Depends(require_role(["admin"]))])
     """
-    async def role_checker(current_user: dict = Depends(get_current_user)) -> dict:
-        user_role = current_user.get("role")
+    async def role_checker(current_user: UserInfo = Depends(get_current_user)) -> UserInfo:
+        user_role = current_user.role
         
         if user_role not in allowed_roles:
             raise HTTPException(
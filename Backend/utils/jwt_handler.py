@@ -4,8 +4,85 @@ Handles creation and verification of JWT tokens for authentication
 """
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from jose import JWTError, jwt
-from config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+from collections import namedtuple
+from cachetools import TLRUCache, TTLCache
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import jwt
+from jwt.exceptions import InvalidKeyError, InvalidTokenError as JWTError
+from config import (
+    ConfigurationError,
+    JWT_SECRET_KEY,
+    JWT_ALGORITHM,
+    JWT_HMAC_ALGORITHMS,
+    JWT_PRIVATE_KEY,
+    JWT_PUBLIC_KEY,
+    JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Authenticated user built from token claims; immutable and slot-sized, as
+# one is made for every authenticated request
+UserInfo = namedtuple(
+    "UserInfo",
+    ["phone", "role", "name", "device_id", "location_id", "created_at", "checked_at"]
+)
+
+# Token lifetime in seconds when create_access_token isn't given one
+_DEFAULT_EXPIRES_SECONDS = JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# HMAC algorithms use the shared secret; asymmetric ones (EdDSA, ES256, RS256)
+# sign with the private key and verify with the public key. Keys are prepared
+# once here (the secret encoded to bytes, PEM keys parsed) rather than on
+# every encode/decode
+if JWT_ALGORITHM in JWT_HMAC_ALGORITHMS:
+    _signing_key = _verifying_key = JWT_SECRET_KEY.encode("utf-8")
+else:
+    _algorithm = jwt.get_algorithm_by_name(JWT_ALGORITHM)
+    try:
+        _signing_key = _algorithm.prepare_key(JWT_PRIVATE_KEY)
+        _verifying_key = _algorithm.prepare_key(JWT_PUBLIC_KEY)
+    except (InvalidKeyError, ValueError) as e:
+        raise ConfigurationError(
+            f"JWT_PRIVATE_KEY/JWT_PUBLIC_KEY are not a valid {JWT_ALGORITHM} PEM keypair: {e}"
+        ) from e
+
+# HS256 tokens are minted without jwt.encode: the header never changes, so
+# it is encoded once, and the keyed HMAC state is copied per token instead
+# of re-deriving it from the secret
+if JWT_ALGORITHM == "HS256":
+    _HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+    _HMAC_TEMPLATE = hmac.new(_signing_key, None, hashlib.sha256)
+    # json.dumps with custom separators builds a new encoder on every call
+    _encode_claims = json.JSONEncoder(separators=(",", ":")).encode
+else:
+    _HMAC_TEMPLATE = None
+
+# Verified payloads keyed by a 16-byte BLAKE2b hash of their token (raw tokens
+# are never stored), so repeat requests skip signature verification. Entries live
+# until the token expires, capped at PAYLOAD_CACHE_TTL seconds. Per worker
+# process - there is no shared cache here.
+PAYLOAD_CACHE_TTL = 300
+_payload_cache = TLRUCache(
+    maxsize=10000,
+    ttu=lambda _key, payload, now: min(payload.get("exp", 0), now + PAYLOAD_CACHE_TTL),
+    timer=time.time
+)
+
+# Hashes of recently rejected tokens, so a replayed bad token is turned away
+# without being decoded again. The short TTL limits how long a mistake sticks
+REJECTED_CACHE_TTL = 5
+_rejected_cache = TTLCache(maxsize=4096, ttl=REJECTED_CACHE_TTL, timer=time.time)
+
+# Guards both caches; verify_token may be called from worker threads
+_token_cache_lock = threading.Lock()
 
 
 def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -19,24 +96,36 @@ def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         Encoded JWT token string
     """
-    to_encode = data.copy()
-    
-    # Set expiration time
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({
-        "exp": expire,
-        "iat": datetime.utcnow()
-    })
+    # Registered claims as integer epoch seconds (RFC 7519 NumericDate),
+    # so the library has no datetimes to convert
+    now = int(time.time())
+    lifetime = int(expires_delta.total_seconds()) if expires_delta else _DEFAULT_EXPIRES_SECONDS
+    to_encode = {
+        **data,
+        "exp": now + lifetime,
+        "iat": now
+    }
     
     # Create JWT token
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    if _HMAC_TEMPLATE is not None:
+        return _fast_hs256_encode(to_encode)
+    encoded_jwt = jwt.encode(to_encode, _signing_key, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
+def _fast_hs256_encode(claims: Dict) -> str:
+    """
+    Sign claims as an HS256 JWT using the precomputed header and HMAC key
+    Produces the same compact JSON and base64url encoding as jwt.encode
+    """
+    payload = _encode_claims(claims).encode()
+    signing_input = _HEADER_B64 + b"." + base64.urlsafe_b64encode(payload).rstrip(b"=")
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(signing_input)
+    signature = base64.urlsafe_b64encode(mac.digest()).rstrip(b"=")
+    return (signing_input + b"." + signature).decode()
+
+
 def verify_token(token: str) -> Optional[Dict]:
     """
     Verify and decode a JWT token
@@ -47,15 +136,40 @@ def verify_token(token: str) -> Optional[Dict]:
     Returns:
         Decoded token payload if valid, None if invalid
     """
-    try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        payload = _payload_cache.get(cache_key)
+        rejected = payload is None and cache_key in _rejected_cache
+    if payload is not None:
         return payload
+    if rejected:
+        return None
+    
+    try:
+        payload = jwt.decode(token, _verifying_key, algorithms=[JWT_ALGORITHM])
     except JWTError as e:
-        print(f"JWT verification failed: {e}")
+        # Debug only: writing on every bad token would make failures slower
+        # than successes and flood the log under token-guessing traffic
+        logger.debug("JWT verification failed: %s", e)
+        with _token_cache_lock:
+            _rejected_cache[cache_key] = True
         return None
+    
+    # Only successful verifications go in the payload cache
+    with _token_cache_lock:
+        _payload_cache[cache_key] = payload
+    return payload
 
 
-def create_user_token(phone: str, role: str, name: str) -> str:
+def create_user_token(
+    phone: str,
+    role: str,
+    name: str,
+    device_id: Optional[str] = None,
+    location_id: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+    checked_at: Optional[int] = None
+) -> str:
     """
     Create a JWT token for a user
     
@@ -63,6 +177,11 @@ def create_user_token(phone: str, role: str, name: str) -> str:
         phone: User's phone number
         role: User's role (employee/manager/admin)
         name: User's name
+        device_id: User's registered device identifier, if any
+        location_id: User's assigned location, if any
+        created_at: When the user account was created
+        checked_at: Epoch seconds when these claims were last read from the
+            database (defaults to now)
     
     Returns:
         JWT token string
@@ -70,26 +189,33 @@ def create_user_token(phone: str, role: str, name: str) -> str:
     token_data = {
         "sub": phone,  # Subject (user identifier)
         "role": role,
-        "name": name
+        "name": name,
+        "device_id": device_id,
+        "location_id": location_id,
+        "created_at": created_at.isoformat() if created_at else None,
+        "checked_at": checked_at if checked_at is not None else int(time.time())
     }
     return create_access_token(token_data)
 
 
-def decode_token(token: str) -> Optional[Dict]:
+def user_from_payload(payload: Dict) -> UserInfo:
     """
-    Decode a JWT token and extract user information
+    Extract user information from a verified token payload
     
     Args:
-        token: JWT token string
+        payload: Decoded JWT payload
     
     Returns:
-        Dictionary with user info (phone, role, name) or None if invalid
+        UserInfo (phone, role, name, device_id, location_id, created_at,
+        checked_at)
     """
-    payload = verify_token(token)
-    if payload:
-        return {
-            "phone": payload.get("sub"),
-            "role": payload.get("role"),
-            "name": payload.get("name")
-        }
-    return None
+    get = payload.get
+    return UserInfo(
+        get("sub"),
+        get("role"),
+        get("name"),
+        get("device_id"),
+        get("location_id"),
+        get("created_at"),
+        get("checked_at")
+    )
@@ -0,0 +1,53 @@
+"""
+Logging Configuration
+Routes app log records through a queue so writing them never blocks the event loop
+"""
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+
+# Background thread that drains the queue into the real handlers, and the
+# handler it feeds from; both are None unless start_logging installed them
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def start_logging():
+    """
+    Attach a QueueHandler to the root logger
+    Records are formatted and written to stderr by a listener thread
+
+    Does nothing if the root logger already has handlers (e.g. uvicorn
+    --log-config), and never changes the log level, which is left to
+    deployment configuration
+    """
+    global _listener, _queue_handler
+    root_logger = logging.getLogger()
+    if _listener or root_logger.handlers:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root_logger.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def stop_logging():
+    """
+    Flush queued records, stop the listener thread and detach its handler
+    """
+    global _listener, _queue_handler
+    if _listener:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None